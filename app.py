@@ -27,7 +27,7 @@ def main():
 
     # Start health check server
     try:
-        server_port = int(config.server_port)
+        server_port = config.server_port
         health_server = HealthCheckServer(server_port, logger)
         health_server.start()
         # Initially set to not ready
@@ -49,6 +49,9 @@ def main():
             password=config.db_password,
             logger=logger,
             schema=config.db_schema,
+            min_connections=config.db_pool_min_connections,
+            max_connections=config.db_pool_max_connections,
+            synchronous_commit=config.db_synchronous_commit,
         )
 
         # Test database connection
@@ -63,7 +66,9 @@ def main():
 
     # Get already processed trace IDs from the database
     try:
-        processed_trace_ids = db_client.get_processed_trace_ids()
+        processed_trace_ids = db_client.get_processed_trace_ids(
+            limit=config.processed_trace_ids_preload
+        )
         logger.info(f"Loaded {len(processed_trace_ids)} previously processed trace IDs")
     except Exception as e:
         logger.error("Failed to load processed trace IDs", e)
@@ -80,11 +85,11 @@ def main():
     except Exception as e:
         logger.fatal("Failed to initialize trace consumer", e)
 
-    # Start health check thread
+    # Schedule health checks, run from the Kafka consume loop
     try:
-        trace_consumer.start_health_check_thread(health_server)
+        trace_consumer.start_health_checks(health_server)
     except Exception as e:
-        logger.error(f"Failed to start health check thread: {str(e)}", e)
+        logger.error(f"Failed to schedule health checks: {str(e)}", e)
 
     # Initialize Kafka consumer
     try:
@@ -95,11 +100,27 @@ def main():
             config.kafka_username,
             config.kafka_password,
             config.kafka_auth,
-            trace_consumer.process_message,
+            trace_consumer.process_batch,
             logger,
             config.max_retries,
             config.retry_backoff_ms,
             processed_trace_ids,
+            batch_size=config.batch_size,
+            batch_timeout_ms=config.batch_timeout_ms,
+            worker_threads=config.worker_threads,
+            fetch_min_bytes=config.kafka_fetch_min_bytes,
+            fetch_max_wait_ms=config.kafka_fetch_max_wait_ms,
+            max_partition_fetch_bytes=config.kafka_max_partition_fetch_bytes,
+            max_poll_records=config.kafka_max_poll_records,
+            compression_codec=config.kafka_compression_codec,
+            tick_handler=trace_consumer.check_health,
+            commit_every=config.kafka_commit_every,
+            commit_interval_ms=config.kafka_commit_interval_ms,
+            queued_max_messages_kbytes=config.kafka_queued_max_messages_kbytes,
+            queued_min_messages=config.kafka_queued_min_messages,
+            receive_message_max_bytes=config.kafka_receive_message_max_bytes,
+            socket_receive_buffer_bytes=config.kafka_socket_receive_buffer_bytes,
+            processed_trace_ids_size=config.processed_trace_ids_size,
         )
         logger.info("Kafka consumer initialized successfully")
         health_server.set_kafka_health(True)
@@ -135,9 +156,6 @@ def main():
     logger.info("Starting graceful shutdown...")
 
     try:
-        # Stop health check thread
-        trace_consumer.stop_health_check_thread()
-
         # Close the consumer
         logger.info("Closing Kafka consumer...")
         consumer.close()
@@ -6,8 +6,11 @@ class Config:
     """Configuration class that loads values from environment variables"""
 
     def __init__(self):
+        # Snapshot of the environment, which is fixed for the process lifetime
+        self._env = dict(os.environ)
+
         # Server configuration
-        self.server_port = self._get_env("SERVER_PORT", "8082")
+        self.server_port = int(self._get_env("SERVER_PORT", "8082"))
 
         # Kafka configuration
         kafka_brokers_str = self._get_env(
@@ -22,6 +25,35 @@ class Config:
         self.kafka_username = self._get_env("KAFKA_USERNAME", "")
         self.kafka_password = self._get_env("KAFKA_PASSWORD", "")
         self.kafka_auth = bool(self.kafka_username and self.kafka_password)
+        self.kafka_fetch_min_bytes = int(
+            self._get_env("KAFKA_FETCH_MIN_BYTES", "1048576")
+        )
+        self.kafka_fetch_max_wait_ms = int(
+            self._get_env("KAFKA_FETCH_MAX_WAIT_MS", "500")
+        )
+        self.kafka_max_partition_fetch_bytes = int(
+            self._get_env("KAFKA_MAX_PARTITION_FETCH_BYTES", "5242880")
+        )
+        self.kafka_max_poll_records = int(
+            self._get_env("KAFKA_MAX_POLL_RECORDS", "500")
+        )
+        self.kafka_queued_max_messages_kbytes = int(
+            self._get_env("KAFKA_QUEUED_MAX_MESSAGES_KBYTES", "131072")
+        )
+        self.kafka_queued_min_messages = int(
+            self._get_env("KAFKA_QUEUED_MIN_MESSAGES", "100000")
+        )
+        self.kafka_receive_message_max_bytes = int(
+            self._get_env("KAFKA_RECEIVE_MESSAGE_MAX_BYTES", "104857600")
+        )
+        self.kafka_socket_receive_buffer_bytes = int(
+            self._get_env("KAFKA_SOCKET_RECEIVE_BUFFER_BYTES", "1048576")
+        )
+        self.kafka_compression_codec = self._get_env("KAFKA_COMPRESSION_CODEC", "zstd")
+        self.kafka_commit_every = int(self._get_env("KAFKA_COMMIT_EVERY", "100"))
+        self.kafka_commit_interval_ms = int(
+            self._get_env("KAFKA_COMMIT_INTERVAL_MS", "1000")
+        )
 
         # Database configuration
         self.db_host = self._get_env(
@@ -32,17 +64,54 @@ class Config:
         self.db_user = self._get_env("DB_USER", "postgres")
         self.db_password = self._get_env("DB_PASSWORD", "")
         self.db_schema = self._get_env("DB_SCHEMA", "trace")
+        self.db_synchronous_commit = self._get_env("DB_SYNCHRONOUS_COMMIT", "off")
 
         # Retry configuration
         self.max_retries = int(self._get_env("MAX_RETRIES", "3"))
         self.retry_backoff_ms = int(self._get_env("RETRY_BACKOFF_MS", "1000"))
 
+        # Number of recently processed trace IDs loaded at startup to skip
+        # duplicates without querying the database
+        self.processed_trace_ids_preload = int(
+            self._get_env("PROCESSED_TRACE_IDS_PRELOAD", "10000")
+        )
+        # Number of processed trace IDs kept in memory
+        self.processed_trace_ids_size = int(
+            self._get_env("PROCESSED_TRACE_IDS_SIZE", "100000")
+        )
+
+        # Batch configuration
+        self.batch_size = int(self._get_env("BATCH_SIZE", "64"))
+        self.batch_timeout_ms = int(self._get_env("BATCH_TIMEOUT_MS", "500"))
+        self.worker_threads = int(self._get_env("WORKER_THREADS", "4"))
+
+        # Database pool configuration. Every lane holds a connection while
+        # saving a batch and the health check needs one more. The pool closes
+        # connections returned beyond its minimum, so keep all of them open.
+        self.db_pool_min_connections = int(
+            self._get_env("DB_POOL_MIN_CONNECTIONS", str(self.worker_threads + 1))
+        )
+        self.db_pool_max_connections = int(
+            self._get_env("DB_POOL_MAX_CONNECTIONS", "8")
+        )
+
         # Health check configuration
         self.health_check_interval = int(self._get_env("HEALTH_CHECK_INTERVAL", "60"))
 
+        if self.worker_threads < 1:
+            raise ValueError("WORKER_THREADS must be at least 1")
+        # A smaller minimum reconnects and prepares again for most batches
+        if self.db_pool_min_connections <= self.worker_threads:
+            raise ValueError("DB_POOL_MIN_CONNECTIONS must be above WORKER_THREADS")
+        # An exhausted pool would drop batches
+        if self.db_pool_max_connections < self.db_pool_min_connections:
+            raise ValueError(
+                "DB_POOL_MAX_CONNECTIONS must be at least DB_POOL_MIN_CONNECTIONS"
+            )
+
     def _get_env(self, key: str, default: str) -> str:
         """Get an environment variable or return a default value"""
-        return os.environ.get(key, default)
+        return self._env.get(key, default)
 
     def to_dict(self) -> Dict[str, Any]:
         """Convert configuration to a dictionary"""
@@ -52,13 +121,32 @@ class Config:
             "kafka_topic": self.kafka_topic,
             "consumer_group": self.consumer_group,
             "kafka_auth": self.kafka_auth,
+            "kafka_fetch_min_bytes": self.kafka_fetch_min_bytes,
+            "kafka_fetch_max_wait_ms": self.kafka_fetch_max_wait_ms,
+            "kafka_max_partition_fetch_bytes": self.kafka_max_partition_fetch_bytes,
+            "kafka_max_poll_records": self.kafka_max_poll_records,
+            "kafka_compression_codec": self.kafka_compression_codec,
+            "kafka_commit_every": self.kafka_commit_every,
+            "kafka_commit_interval_ms": self.kafka_commit_interval_ms,
+            "kafka_queued_max_messages_kbytes": self.kafka_queued_max_messages_kbytes,
+            "kafka_queued_min_messages": self.kafka_queued_min_messages,
+            "kafka_receive_message_max_bytes": self.kafka_receive_message_max_bytes,
+            "kafka_socket_receive_buffer_bytes": self.kafka_socket_receive_buffer_bytes,
             "db_host": self.db_host,
             "db_port": self.db_port,
             "db_name": self.db_name,
             "db_user": self.db_user,
             "db_schema": self.db_schema,
+            "db_pool_min_connections": self.db_pool_min_connections,
+            "db_pool_max_connections": self.db_pool_max_connections,
+            "db_synchronous_commit": self.db_synchronous_commit,
             "max_retries": self.max_retries,
             "retry_backoff_ms": self.retry_backoff_ms,
+            "processed_trace_ids_preload": self.processed_trace_ids_preload,
+            "processed_trace_ids_size": self.processed_trace_ids_size,
+            "batch_size": self.batch_size,
+            "batch_timeout_ms": self.batch_timeout_ms,
+            "worker_threads": self.worker_threads,
             "health_check_interval": self.health_check_interval,
         }
 
@@ -1,5 +1,4 @@
 from typing import List, Dict, Any, Optional
-import threading
 import time
 
 from services.db_service import PostgresClient
@@ -21,8 +20,8 @@ class TraceConsumer:
         self.db_client = db_client
         self.logger = logger
         self.health_check_interval = health_check_interval
-        self.health_check_thread = None
-        self.running = False
+        self.health_server = None
+        self._next_health_check = 0.0
 
     def process_message(self, message: TraceProcessedMessage) -> bool:
         """
@@ -59,36 +58,83 @@ class TraceConsumer:
             )
             return False
 
-    def start_health_check_thread(self, health_server):
-        """Start a thread to periodically check health of external services"""
-        self.running = True
-
-        def health_check_worker():
-            while self.running:
-                try:
-                    # Check database health
-                    db_healthy = self.db_client.test_connection()
-                    health_server.set_db_health(db_healthy)
-
-                    # Sleep for interval
-                    time.sleep(self.health_check_interval)
-                except Exception as e:
-                    self.logger.error(f"Health check error: {str(e)}", e)
-                    # Set unhealthy
-                    health_server.set_db_health(False)
-                    # Still sleep to avoid tight loop
-                    time.sleep(max(5, self.health_check_interval // 2))
-
-        self.health_check_thread = threading.Thread(target=health_check_worker)
-        self.health_check_thread.daemon = True
-        self.health_check_thread.start()
+    def process_batch(self, messages: List[TraceProcessedMessage]) -> bool:
+        """
+        Process a batch of trace processed messages and store them in the
+        database in a single transaction
+
+        Args:
+            messages: The messages containing processed trace data
+
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        self.logger.info("Processing trace batch", "size", len(messages))
+
+        try:
+            success = self.db_client.save_processed_messages_batch(messages)
+
+            if not success and len(messages) > 1:
+                # A single bad message fails the whole transaction, so save
+                # them one at a time and only lose the ones that fail
+                self.logger.info(
+                    "Saving trace batch one message at a time", "size", len(messages)
+                )
+                results = [self.process_message(message) for message in messages]
+                success = all(results)
+
+            if success:
+                self.logger.info(
+                    "Successfully processed trace batch", "size", len(messages)
+                )
+            else:
+                self.logger.error(
+                    "Failed to save trace batch to database",
+                    None,
+                    "size",
+                    len(messages),
+                )
+
+            return success
+        except Exception as e:
+            self.logger.error(
+                f"Error processing trace batch: {str(e)}",
+                e,
+                "size",
+                len(messages),
+            )
+            return False
+
+    def start_health_checks(self, health_server):
+        """
+        Schedule periodic health checks of external services
+
+        No thread is started, the checks run when check_health is called
+        from the Kafka consume loop.
+        """
+        self.health_server = health_server
+        self._next_health_check = time.monotonic() + self.health_check_interval
         self.logger.info(
-            f"Health check thread started, interval: {self.health_check_interval}s"
+            f"Health checks scheduled, interval: {self.health_check_interval}s"
         )
 
-    def stop_health_check_thread(self):
-        """Stop the health check thread"""
-        self.running = False
-        if self.health_check_thread:
-            self.health_check_thread.join(timeout=5)
-            self.logger.info("Health check thread stopped")
+    def check_health(self) -> None:
+        """Check health of external services if a check is due"""
+        if self.health_server is None:
+            return
+
+        now = time.monotonic()
+        if now < self._next_health_check:
+            return
+
+        try:
+            # Check database health
+            db_healthy = self.db_client.test_connection()
+            self.health_server.set_db_health(db_healthy)
+            self._next_health_check = now + self.health_check_interval
+        except Exception as e:
+            self.logger.error(f"Health check error: {str(e)}", e)
+            # Set unhealthy
+            self.health_server.set_db_health(False)
+            # Check again sooner
+            self._next_health_check = now + max(5, self.health_check_interval // 2)
@@ -1,18 +1,44 @@
+import io
+import itertools
+import time
+from contextlib import contextmanager
 import psycopg2
 import psycopg2.extras
-from typing import List, Dict, Any, Optional, Tuple
+import psycopg2.pool
+from psycopg2.extensions import TRANSACTION_STATUS_UNKNOWN, connection
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
 from datetime import datetime
 
-from models.data_models import (
-    DbCourse,
-    DbInstructor,
-    DbRating,
-    DbComment,
-    DbProcessedTrace,
-    TraceProcessedMessage,
-)
+from models.data_models import TraceProcessedMessage
 from utils.logging import Logger
 
+# Characters that must be escaped in COPY text format
+_COPY_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+
+def _copy_text(value: Any) -> str:
+    """Encode a value as a field in COPY text format"""
+    if value is None:
+        return "\\N"
+    return str(value).translate(_COPY_ESCAPES)
+
+
+class _ConnectionLost(Exception):
+    """Raised when a database error left its connection closed or unusable"""
+
+
+def _is_lost(conn: connection) -> bool:
+    """Return True if the connection is closed or its server is gone"""
+    return bool(conn.closed) or (
+        conn.info.transaction_status == TRANSACTION_STATUS_UNKNOWN
+    )
+
+
+class _PreparedConnection(connection):
+    """Connection that tracks whether the hot statements have been prepared on it"""
+
+    statements_prepared = False
+
 
 class PostgresClient:
     """Client for interacting with PostgreSQL database"""
@@ -26,6 +52,12 @@ class PostgresClient:
         password: str,
         logger: Logger,
         schema: str = "trace",
+        page_size: int = 200,
+        copy_threshold: int = 500,
+        min_connections: int = 5,
+        max_connections: int = 8,
+        health_cache_seconds: float = 10.0,
+        synchronous_commit: str = "off",
     ):
         """Initialize the PostgreSQL client"""
         self.connection_params = {
@@ -35,228 +67,382 @@ class PostgresClient:
             "user": user,
             "password": password,
         }
+        if synchronous_commit:
+            # Set for every pooled session, so commits skip the WAL flush wait
+            # without a SET round trip per transaction
+            self.connection_params["options"] = (
+                f"-c synchronous_commit={synchronous_commit}"
+            )
         self.logger = logger
         self.schema = schema
-        self.conn = None
+        # Number of rows sent per multi-row INSERT statement
+        self.page_size = page_size
+        # Row count above which ratings and comments are loaded with COPY
+        self.copy_threshold = copy_threshold
+        self.min_connections = min_connections
+        self.max_connections = max_connections
+        self.pool = None
+
+        # Monotonic time of the last successful database round trip
+        self.health_cache_seconds = health_cache_seconds
+        self.last_ok_at = 0.0
 
         # Try to establish initial connection
         self._connect()
 
     def _connect(self) -> None:
-        """Establish connection to PostgreSQL database"""
+        """Create the pool of connections to the PostgreSQL database"""
         try:
-            if self.conn is None or self.conn.closed:
-                self.logger.info(
-                    f"Connecting to PostgreSQL at {self.connection_params['host']}:{self.connection_params['port']}"
-                )
-                self.conn = psycopg2.connect(**self.connection_params)
-                self.conn.autocommit = False
-                self.logger.info("Connected to PostgreSQL successfully")
+            self.logger.info(
+                f"Connecting to PostgreSQL at {self.connection_params['host']}:{self.connection_params['port']}"
+            )
+            self.pool = psycopg2.pool.ThreadedConnectionPool(
+                self.min_connections,
+                self.max_connections,
+                connection_factory=_PreparedConnection,
+                **self.connection_params,
+            )
+            self.logger.info("Connected to PostgreSQL successfully")
         except Exception as e:
             self.logger.error(f"Failed to connect to PostgreSQL: {str(e)}", e)
             raise
 
-    def _ensure_connection(self) -> None:
-        """Ensure connection is established"""
+    def _prepare_statements(self, conn: "_PreparedConnection") -> None:
+        """Prepare the statements run for every saved trace on a connection"""
+        with conn, conn.cursor() as cursor:
+            # Statements outlive rolled back transactions, so start from a clean
+            # slate in case an earlier attempt failed part way through
+            cursor.execute("DEALLOCATE ALL")
+            # Instructor, course and join table row in one round trip
+            statement = f"""
+            PREPARE trace_save_course AS
+            WITH instructor AS (
+                INSERT INTO {self.schema}.instructors (name)
+                VALUES ($1)
+                ON CONFLICT (name) DO UPDATE SET name = EXCLUDED.name
+                RETURNING id
+            ),
+            course AS (
+                INSERT INTO {self.schema}.courses 
+                (course_id, course_name, subject, catalog_section, semester, year, 
+                 enrollment, responses, declines, processed_at, original_file_name, 
+                 gcs_bucket, gcs_path)
+                VALUES 
+                ($2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14)
+                ON CONFLICT (course_id, semester, year) 
+                DO UPDATE SET 
+                    course_name = EXCLUDED.course_name,
+                    subject = EXCLUDED.subject,
+                    catalog_section = EXCLUDED.catalog_section,
+                    enrollment = EXCLUDED.enrollment,
+                    responses = EXCLUDED.responses,
+                    declines = EXCLUDED.declines,
+                    processed_at = EXCLUDED.processed_at,
+                    original_file_name = EXCLUDED.original_file_name,
+                    gcs_bucket = EXCLUDED.gcs_bucket,
+                    gcs_path = EXCLUDED.gcs_path
+                RETURNING id
+            ),
+            link AS (
+                INSERT INTO {self.schema}.course_instructors (course_id, instructor_id)
+                SELECT course.id, instructor.id FROM course, instructor
+                ON CONFLICT (course_id, instructor_id) DO NOTHING
+            )
+            SELECT id FROM course
+            """
+            cursor.execute(statement)
+        conn.statements_prepared = True
+
+    @contextmanager
+    def _connection(self) -> Iterator["_PreparedConnection"]:
+        """Borrow a connection from the pool for the duration of the block"""
+        conn = self.pool.getconn()
         try:
-            if self.conn is None or self.conn.closed:
-                self._connect()
-
-            # Check if connection is alive
-            cursor = self.conn.cursor()
-            cursor.execute("SELECT 1")
-            cursor.close()
-        except Exception:
-            # Try to reconnect
-            self.logger.info("Connection lost, attempting to reconnect...")
-            self._connect()
+            if not conn.statements_prepared:
+                self._prepare_statements(conn)
+            yield conn
+        except psycopg2.Error as e:
+            # Errors such as deadlocks leave a healthy connection behind, only
+            # a lost one is reported as such
+            if _is_lost(conn):
+                raise _ConnectionLost(str(e)) from e
+            raise
+        finally:
+            # Lost connections are dropped from the pool instead of reused
+            self.pool.putconn(conn, close=_is_lost(conn))
 
     def test_connection(self) -> bool:
-        """Test database connection, return True if successful"""
+        """
+        Test database connection, return True if successful
+
+        A transaction committed within the last health_cache_seconds counts as
+        a successful test, so the probe only runs while traffic is idle.
+        """
+        if time.monotonic() - self.last_ok_at < self.health_cache_seconds:
+            return True
+
         try:
-            self._ensure_connection()
-            cursor = self.conn.cursor()
-            cursor.execute("SELECT 1")
-            cursor.fetchone()
-            cursor.close()
+            with self._connection() as conn, conn:
+                with conn.cursor() as cursor:
+                    cursor.execute("SELECT 1")
+                    cursor.fetchone()
+            self.last_ok_at = time.monotonic()
             return True
         except Exception as e:
             self.logger.error(f"Database connection test failed: {str(e)}", e)
             return False
 
     def close(self) -> None:
-        """Close the database connection"""
-        if self.conn and not self.conn.closed:
-            self.conn.close()
+        """Close all database connections"""
+        if self.pool and not self.pool.closed:
+            self.pool.closeall()
             self.logger.info("Database connection closed")
 
     def save_processed_message(self, message: TraceProcessedMessage) -> bool:
         """
         Save all data from a processed message to the database
 
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        return self.save_processed_messages_batch([message])
+
+    def save_processed_messages_batch(
+        self, messages: List[TraceProcessedMessage]
+    ) -> bool:
+        """
+        Save all data from a batch of processed messages in a single transaction
+
+        Ratings, comments and processed trace records for the whole batch are
+        written with one multi-row INSERT per table.
+
         Returns:
             bool: True if successful, False otherwise
         """
         try:
-            self._ensure_connection()
-            with self.conn:  # Transaction context
-                with self.conn.cursor() as cursor:
-                    # First check if this trace has already been processed
-                    cursor.execute(
-                        f"SELECT id FROM {self.schema}.processed_traces WHERE trace_id = %s",
-                        (message.traceId,),
-                    )
-                    if cursor.fetchone():
-                        self.logger.info(
-                            f"Trace {message.traceId} already processed, skipping"
-                        )
-                        return True
+            try:
+                self._save_batch(messages)
+            except _ConnectionLost as e:
+                # The connection has been discarded, retry once on a fresh one
+                self.logger.info(f"Connection lost while saving, retrying: {str(e)}")
+                self._save_batch(messages)
+            return True
+        except Exception as e:
+            self.logger.error(
+                f"Error saving processed messages to database: {str(e)}", e
+            )
+            return False
 
-                    # 1. Save the instructor
-                    db_instructor = DbInstructor.from_instructor(message.instructor)
-                    cursor.execute(
-                        f"""
-                        INSERT INTO {self.schema}.instructors (name)
-                        VALUES (%s)
-                        ON CONFLICT (name) DO UPDATE SET name = EXCLUDED.name
-                        RETURNING id
-                        """,
-                        (db_instructor.name,),
-                    )
-                    instructor_id = cursor.fetchone()[0]
+    def _save_batch(self, messages: List[TraceProcessedMessage]) -> None:
+        """
+        Save a batch of processed messages in a single transaction
 
-                    # 2. Save the course
-                    db_course = DbCourse.from_course(message.course)
-                    cursor.execute(
-                        f"""
-                        INSERT INTO {self.schema}.courses 
-                        (course_id, course_name, subject, catalog_section, semester, year, 
-                         enrollment, responses, declines, processed_at, original_file_name, 
-                         gcs_bucket, gcs_path)
-                        VALUES 
-                        (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                        ON CONFLICT (course_id, semester, year) 
-                        DO UPDATE SET 
-                            course_name = EXCLUDED.course_name,
-                            subject = EXCLUDED.subject,
-                            catalog_section = EXCLUDED.catalog_section,
-                            enrollment = EXCLUDED.enrollment,
-                            responses = EXCLUDED.responses,
-                            declines = EXCLUDED.declines,
-                            processed_at = EXCLUDED.processed_at,
-                            original_file_name = EXCLUDED.original_file_name,
-                            gcs_bucket = EXCLUDED.gcs_bucket,
-                            gcs_path = EXCLUDED.gcs_path
-                        RETURNING id
-                        """,
-                        (
-                            db_course.course_id,
-                            db_course.course_name,
-                            db_course.subject,
-                            db_course.catalog_section,
-                            db_course.semester,
-                            db_course.year,
-                            db_course.enrollment,
-                            db_course.responses,
-                            db_course.declines,
-                            db_course.processed_at,
-                            db_course.original_file_name,
-                            db_course.gcs_bucket,
-                            db_course.gcs_path,
-                        ),
-                    )
-                    course_id = cursor.fetchone()[0]
+        Assumes processed_traces has a unique constraint on a text trace_id
+        column, so the IDs it returns match those of the messages, and a
+        course_id column referencing courses.id.
+        """
+        if not messages:
+            return
+        with self._connection() as conn, conn:  # Transaction context
+            with conn.cursor() as cursor:
+                # Skip the traces already processed
+                unique = {}
+                for message in messages:
+                    unique.setdefault(message.traceId, message)
+                cursor.execute(
+                    f"""
+                    SELECT trace_id FROM {self.schema}.processed_traces
+                    WHERE trace_id IN %s
+                    """,
+                    (tuple(unique),),
+                )
+                processed_ids = {row[0] for row in cursor.fetchall()}
 
-                    # 3. Link course and instructor in the join table
-                    cursor.execute(
-                        f"""
-                        INSERT INTO {self.schema}.course_instructors (course_id, instructor_id)
-                        VALUES (%s, %s)
-                        ON CONFLICT (course_id, instructor_id) DO NOTHING
-                        """,
-                        (course_id, instructor_id),
-                    )
+                # Upserts lock existing instructor and course rows until commit,
+                # so take them in a fixed order to keep concurrent lanes from
+                # deadlocking on rows their batches share
+                courses = {}
+                for trace_id, message in sorted(
+                    unique.items(),
+                    key=lambda item: (
+                        item[1].instructor.name,
+                        item[1].course.courseId,
+                        item[1].course.semester,
+                        item[1].course.year,
+                    ),
+                ):
+                    if trace_id in processed_ids:
+                        if self.logger.is_enabled_for(Logger.INFO):
+                            self.logger.info(
+                                f"Trace {trace_id} already processed, skipping"
+                            )
+                        continue
+                    courses[trace_id] = (self._save_course(cursor, message), message)
 
-                    # 4. Save ratings
-                    for rating in message.ratings:
-                        db_rating = DbRating.from_rating(rating, course_id)
-                        cursor.execute(
-                            f"""
-                            INSERT INTO {self.schema}.ratings 
-                            (course_id, question_text, category, responses, response_rate, 
-                             course_mean, dept_mean, univ_mean, course_median, dept_median, univ_median)
-                            VALUES 
-                            (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                            """,
-                            (
-                                db_rating.course_id,
-                                db_rating.question_text,
-                                db_rating.category,
-                                db_rating.responses,
-                                db_rating.response_rate,
-                                db_rating.course_mean,
-                                db_rating.dept_mean,
-                                db_rating.univ_mean,
-                                db_rating.course_median,
-                                db_rating.dept_median,
-                                db_rating.univ_median,
-                            ),
+                # Claim the traces together with their course. A trace claimed
+                # by a concurrent transaction since the check is still skipped,
+                # its course was upserted from the same message.
+                claimed = psycopg2.extras.execute_values(
+                    cursor,
+                    f"""
+                    INSERT INTO {self.schema}.processed_traces
+                    (trace_id, processed_at, status, error_message, course_id)
+                    VALUES %s
+                    ON CONFLICT (trace_id) DO NOTHING
+                    RETURNING trace_id
+                    """,
+                    [
+                        (
+                            trace_id,
+                            message.processedAt,
+                            "error" if message.error else "success",
+                            message.error,
+                            course_id,
                         )
+                        for trace_id, (course_id, message) in courses.items()
+                    ],
+                    page_size=self.page_size,
+                    fetch=True,
+                )
+                saved = [courses[row[0]] for row in claimed]
 
-                    # 5. Save comments
-                    for comment in message.comments:
-                        db_comment = DbComment.from_comment(comment, course_id)
-                        cursor.execute(
-                            f"""
-                            INSERT INTO {self.schema}.comments 
-                            (course_id, category, question_text, response_number, comment_text)
-                            VALUES 
-                            (%s, %s, %s, %s, %s)
-                            """,
+                # 4. Save ratings
+                self._insert_rows(
+                    cursor,
+                    "ratings",
+                    (
+                        "course_id",
+                        "question_text",
+                        "category",
+                        "responses",
+                        "response_rate",
+                        "course_mean",
+                        "dept_mean",
+                        "univ_mean",
+                        "course_median",
+                        "dept_median",
+                        "univ_median",
+                    ),
+                    itertools.chain.from_iterable(
+                        (
                             (
-                                db_comment.course_id,
-                                db_comment.category,
-                                db_comment.question_text,
-                                db_comment.response_number,
-                                db_comment.comment_text,
-                            ),
+                                course_id,
+                                rating.questionText,
+                                rating.category,
+                                rating.responses,
+                                rating.responseRate,
+                                rating.courseMean,
+                                rating.deptMean,
+                                rating.univMean,
+                                rating.courseMedian,
+                                rating.deptMedian,
+                                rating.univMedian,
+                            )
+                            for rating in message.ratings
                         )
+                        for course_id, message in saved
+                    ),
+                    sum(len(message.ratings) for _, message in saved),
+                )
 
-                    # 6. Save record of processed trace
-                    status = "error" if message.error else "success"
-                    cursor.execute(
-                        f"""
-                        INSERT INTO {self.schema}.processed_traces 
-                        (trace_id, course_id, processed_at, status, error_message)
-                        VALUES 
-                        (%s, %s, %s, %s, %s)
-                        """,
+                # 5. Save comments
+                self._insert_rows(
+                    cursor,
+                    "comments",
+                    (
+                        "course_id",
+                        "category",
+                        "question_text",
+                        "response_number",
+                        "comment_text",
+                    ),
+                    itertools.chain.from_iterable(
                         (
-                            message.traceId,
-                            course_id,
-                            message.processedAt,
-                            status,
-                            message.error,
-                        ),
-                    )
+                            (
+                                course_id,
+                                comment.category,
+                                comment.questionText,
+                                comment.responseNumber,
+                                comment.commentText,
+                            )
+                            for comment in message.comments
+                        )
+                        for course_id, message in saved
+                    ),
+                    sum(len(message.comments) for _, message in saved),
+                )
 
-                    self.logger.info(
-                        f"Successfully saved trace {message.traceId} to database"
-                    )
+                self.logger.info(f"Successfully saved {len(saved)} traces to database")
 
-            return True
-        except Exception as e:
-            self.logger.error(
-                f"Error saving processed message to database: {str(e)}", e
+        self.last_ok_at = time.monotonic()
+
+    def _insert_rows(
+        self,
+        cursor,
+        table: str,
+        columns: Tuple[str, ...],
+        rows: Iterable[Tuple],
+        row_count: int,
+    ) -> None:
+        """
+        Insert rows into an append-only table
+
+        Uses COPY for more than copy_threshold rows and a multi-row INSERT
+        otherwise. Rows are consumed lazily, so they are never all held in a
+        list before being written.
+        """
+        if not row_count:
+            return
+        column_list = ", ".join(columns)
+        if row_count > self.copy_threshold:
+            buf = io.StringIO()
+            for row in rows:
+                buf.write("\t".join(map(_copy_text, row)))
+                buf.write("\n")
+            buf.seek(0)
+            cursor.copy_expert(
+                f"COPY {self.schema}.{table} ({column_list}) FROM STDIN", buf
             )
-            return False
+        else:
+            psycopg2.extras.execute_values(
+                cursor,
+                f"INSERT INTO {self.schema}.{table} ({column_list}) VALUES %s",
+                rows,
+                page_size=self.page_size,
+            )
+
+    def _save_course(self, cursor, message: TraceProcessedMessage) -> int:
+        """Save and link the instructor and course of a message, return the course id"""
+        course = message.course
+        cursor.execute(
+            """
+            EXECUTE trace_save_course
+            (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            """,
+            (
+                message.instructor.name,
+                course.courseId,
+                course.courseName,
+                course.subject,
+                course.catalogSection,
+                course.semester,
+                course.year,
+                course.enrollment,
+                course.responses,
+                course.declines,
+                course.processedAt,
+                course.originalFileName,
+                course.gcsBucket,
+                course.gcsPath,
+            ),
+        )
+        return cursor.fetchone()[0]
 
     def get_processed_trace_ids(self, limit: int = 100) -> List[str]:
         """Get a list of trace IDs that have already been processed"""
         try:
-            self._ensure_connection()
-            with self.conn:
-                with self.conn.cursor() as cursor:
+            with self._connection() as conn, conn:
+                with conn.cursor() as cursor:
                     cursor.execute(
                         f"""
                         SELECT trace_id FROM {self.schema}.processed_traces
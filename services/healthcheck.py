@@ -3,55 +3,79 @@ HTTP Server for health checks to support Kubernetes liveness and readiness probe
 """
 
 import threading
-from http.server import HTTPServer, BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
 from utils.logging import Logger
 
 
 class HealthCheckHandler(BaseHTTPRequestHandler):
     """HTTP request handler for health check endpoints"""
 
-    # Class-level variables to track application status
-    is_ready = False
-    is_db_healthy = False
-    is_kafka_healthy = False
+    # Bits of the application status
+    READY = 0b001
+    DB_HEALTHY = 0b010
+    KAFKA_HEALTHY = 0b100
+    ALL_HEALTHY = READY | DB_HEALTHY | KAFKA_HEALTHY
+
+    # Class-level variable to track application status, read with a single
+    # load so a probe never sees a partial update
+    health_bits = 0
+    health_lock = threading.Lock()
     logger = None
 
-    def _send_response(self, status_code, content):
+    @classmethod
+    def set_bit(cls, bit: int, value: bool):
+        """Set or clear a status bit"""
+        with cls.health_lock:
+            if value:
+                cls.health_bits |= bit
+            else:
+                cls.health_bits &= ~bit
+
+    def _send_response(self, status_code, content: bytes):
         """Helper method to send HTTP response"""
         self.send_response(status_code)
         self.send_header("Content-Type", "text/plain")
         self.end_headers()
-        self.wfile.write(content.encode("utf-8"))
+        self.wfile.write(content)
 
     def log_message(self, format, *args):
         """Override to use application logger instead of default handler"""
-        if self.logger:
+        # Called for every probe, so skip formatting unless it will be logged
+        if self.logger and self.logger.is_enabled_for(Logger.DEBUG):
             self.logger.debug(f"Health check: {format % args}")
 
     def do_GET(self):
         """Handle GET requests"""
         if self.path == "/healthz/live":
             # Liveness probe - always return 200 if the server is running
-            self._send_response(200, "OK")
+            self._send_response(200, b"OK")
         elif self.path == "/healthz/ready":
             # Readiness probe - return 200 only if the application is fully initialized and dependencies are healthy
-            if (
-                HealthCheckHandler.is_ready
-                and HealthCheckHandler.is_db_healthy
-                and HealthCheckHandler.is_kafka_healthy
-            ):
-                self._send_response(200, "Ready")
+            bits = HealthCheckHandler.health_bits
+            if bits == HealthCheckHandler.ALL_HEALTHY:
+                self._send_response(200, b"Ready")
             else:
-                status = []
-                if not HealthCheckHandler.is_ready:
-                    status.append("Application not ready")
-                if not HealthCheckHandler.is_db_healthy:
-                    status.append("Database not healthy")
-                if not HealthCheckHandler.is_kafka_healthy:
-                    status.append("Kafka not healthy")
-                self._send_response(503, f"Not Ready: {', '.join(status)}")
+                self._send_response(503, _READINESS_BODIES[bits])
         else:
-            self._send_response(404, "Not Found")
+            self._send_response(404, b"Not Found")
+
+
+def _not_ready_body(bits: int) -> bytes:
+    """Build the readiness probe response for a combination of status bits"""
+    status = []
+    if not bits & HealthCheckHandler.READY:
+        status.append("Application not ready")
+    if not bits & HealthCheckHandler.DB_HEALTHY:
+        status.append("Database not healthy")
+    if not bits & HealthCheckHandler.KAFKA_HEALTHY:
+        status.append("Kafka not healthy")
+    return f"Not Ready: {', '.join(status)}".encode("utf-8")
+
+
+# Not ready responses indexed by status bits, built once
+_READINESS_BODIES = tuple(
+    _not_ready_body(bits) for bits in range(HealthCheckHandler.ALL_HEALTHY + 1)
+)
 
 
 class HealthCheckServer:
@@ -76,7 +100,11 @@ class HealthCheckServer:
         self.logger.info(f"Starting health check server on port {self.port}")
 
         try:
-            self.server = HTTPServer(("0.0.0.0", self.port), HealthCheckHandler)
+            # Each probe gets its own thread so a slow one cannot block the rest
+            self.server = ThreadingHTTPServer(
+                ("0.0.0.0", self.port), HealthCheckHandler
+            )
+            self.server.daemon_threads = True
             self.thread = threading.Thread(target=self.server.serve_forever)
             self.thread.daemon = True
             self.thread.start()
@@ -87,17 +115,17 @@ class HealthCheckServer:
 
     def set_ready(self, is_ready: bool):
         """Set the readiness state of the application"""
-        HealthCheckHandler.is_ready = is_ready
+        HealthCheckHandler.set_bit(HealthCheckHandler.READY, is_ready)
         self.logger.info(f"Application readiness set to: {is_ready}")
 
     def set_db_health(self, is_healthy: bool):
         """Set the health state of the database connection"""
-        HealthCheckHandler.is_db_healthy = is_healthy
+        HealthCheckHandler.set_bit(HealthCheckHandler.DB_HEALTHY, is_healthy)
         self.logger.info(f"Database health set to: {is_healthy}")
 
     def set_kafka_health(self, is_healthy: bool):
         """Set the health state of the Kafka connection"""
-        HealthCheckHandler.is_kafka_healthy = is_healthy
+        HealthCheckHandler.set_bit(HealthCheckHandler.KAFKA_HEALTHY, is_healthy)
         self.logger.info(f"Kafka health set to: {is_healthy}")
 
     def stop(self):
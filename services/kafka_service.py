@@ -1,15 +1,96 @@
-import json
+import random
+import threading
 import time
-from typing import Callable, Dict, Any, Optional, List
-from datetime import datetime
-from confluent_kafka import Consumer, KafkaError, KafkaException
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Deque, Dict, Any, Optional, List, Tuple
+import msgspec
+from confluent_kafka import Consumer, KafkaError, KafkaException, TopicPartition
 from models.data_models import TraceProcessedMessage
 from utils.logging import Logger
 
+# Reused for every message so the type is only resolved once
+_DECODER = msgspec.json.Decoder(TraceProcessedMessage, strict=False)
+
+# Recorded, never raised, when the handler reports a failed batch
+_HANDLER_RETURNED_FALSE = Exception("Handler returned False")
+
+
+class _Lane:
+    """Batches of a fixed set of partitions, handled in order by one thread"""
+
+    __slots__ = (
+        "executor",
+        "batch",
+        "pending_offsets",
+        "pending_messages",
+        "batch_started_at",
+        "in_flight",
+    )
+
+    def __init__(self, index: int):
+        """Initialize an empty lane with its worker thread"""
+        self.executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix=f"trace-batch-{index}"
+        )
+
+        # Messages waiting for the next handler call and the offsets to
+        # commit once they have been handled, keyed by (topic, partition)
+        self.batch: List[TraceProcessedMessage] = []
+        self.pending_offsets: Dict[Tuple[str, int], int] = {}
+        self.pending_messages = 0
+        self.batch_started_at: Optional[float] = None
+
+        # Batches submitted to the worker with their offsets and message
+        # count, oldest first
+        self.in_flight: Deque[Tuple[Future, Dict[Tuple[str, int], int], int]] = deque()
+
 
 class KafkaConsumer:
     """Kafka consumer for receiving trace processed messages"""
 
+    # Batches queued or running per lane before fetching waits for the oldest
+    LANE_QUEUE_SIZE = 2
+
+    __slots__ = (
+        "brokers",
+        "topic",
+        "group_id",
+        "username",
+        "password",
+        "enable_auth",
+        "handler",
+        "logger",
+        "max_retries",
+        "retry_backoff_ms",
+        "batch_size",
+        "batch_timeout_ms",
+        "worker_threads",
+        "fetch_min_bytes",
+        "fetch_max_wait_ms",
+        "max_partition_fetch_bytes",
+        "max_poll_records",
+        "compression_codec",
+        "tick_handler",
+        "commit_every",
+        "commit_interval_ms",
+        "queued_max_messages_kbytes",
+        "queued_min_messages",
+        "receive_message_max_bytes",
+        "socket_receive_buffer_bytes",
+        "poll_timeout",
+        "lanes",
+        "consumer",
+        "stop_event",
+        "stopped",
+        "commit_offsets",
+        "commit_messages",
+        "last_commit_at",
+        "processed_trace_ids",
+        "processed_trace_ids_size",
+        "processed_trace_ids_lock",
+    )
+
     def __init__(
         self,
         brokers: list,
@@ -23,8 +104,42 @@ class KafkaConsumer:
         max_retries: int = 3,
         retry_backoff_ms: int = 1000,
         processed_trace_ids: List[str] = None,
+        batch_size: int = 64,
+        batch_timeout_ms: int = 500,
+        worker_threads: int = 4,
+        fetch_min_bytes: int = 1048576,
+        fetch_max_wait_ms: int = 500,
+        max_partition_fetch_bytes: int = 5242880,
+        max_poll_records: int = 500,
+        compression_codec: str = "zstd",
+        tick_handler: Optional[Callable[[], None]] = None,
+        commit_every: int = 100,
+        commit_interval_ms: int = 1000,
+        queued_max_messages_kbytes: int = 131072,
+        queued_min_messages: int = 100000,
+        receive_message_max_bytes: int = 104857600,
+        socket_receive_buffer_bytes: int = 1048576,
+        processed_trace_ids_size: int = 100000,
     ):
-        """Initialize the Kafka consumer"""
+        """
+        Initialize the Kafka consumer
+
+        Messages are accumulated and passed to the handler as a list once
+        batch_size messages are pending or the oldest pending message is
+        batch_timeout_ms old. Partitions are spread over worker_threads lanes,
+        each with its own batch and worker thread, so the messages of a
+        partition are handled in order while fetching continues. Once the
+        handler has returned for a batch and all earlier ones of its lane, its
+        offsets are committed with the others, every commit_every handled
+        messages or commit_interval_ms after the last commit.
+
+        Only the processed_trace_ids_size most recently processed trace IDs
+        are remembered. A trace evicted from them is still skipped by the
+        database, at the cost of a round trip.
+
+        tick_handler, if given, is called on the consuming thread after every
+        poll so periodic work can run without a thread of its own.
+        """
         self.brokers = brokers
         self.topic = topic
         self.group_id = group_id
@@ -35,12 +150,45 @@ class KafkaConsumer:
         self.logger = logger
         self.max_retries = max_retries
         self.retry_backoff_ms = retry_backoff_ms
+        self.batch_size = batch_size
+        self.batch_timeout_ms = batch_timeout_ms
+        self.worker_threads = worker_threads
+        self.fetch_min_bytes = fetch_min_bytes
+        self.fetch_max_wait_ms = fetch_max_wait_ms
+        self.max_partition_fetch_bytes = max_partition_fetch_bytes
+        self.max_poll_records = max_poll_records
+        self.compression_codec = compression_codec
+        self.tick_handler = tick_handler
+        self.commit_every = commit_every
+        self.commit_interval_ms = commit_interval_ms
+        self.queued_max_messages_kbytes = queued_max_messages_kbytes
+        self.queued_min_messages = queued_min_messages
+        self.receive_message_max_bytes = receive_message_max_bytes
+        self.socket_receive_buffer_bytes = socket_receive_buffer_bytes
+        # Wait a little longer than the broker holds a fetch open, but never
+        # so little that an idle topic turns the loop into a busy spin
+        self.poll_timeout = max(0.1, fetch_max_wait_ms * 1.5 / 1000)
+        self.lanes = [_Lane(index) for index in range(worker_threads)]
         self.consumer = self._create_consumer()
-        self.running = False
-
-        # Set of trace IDs that have already been processed
+        # Set to stop the consume loop, which also interrupts its sleeps
+        self.stop_event = threading.Event()
+        # Set while the consume loop is not running
+        self.stopped = threading.Event()
+        self.stopped.set()
+
+        # Offsets of handled batches waiting for the next commit
+        self.commit_offsets: Dict[Tuple[str, int], int] = {}
+        self.commit_messages = 0
+        self.last_commit_at = time.monotonic()
+
+        # Trace IDs that have already been processed, least recent first
         # This helps avoid duplicate processing if the consumer restarts
-        self.processed_trace_ids = set(processed_trace_ids or [])
+        self.processed_trace_ids_size = processed_trace_ids_size
+        self.processed_trace_ids_lock = threading.Lock()
+        self.processed_trace_ids: "OrderedDict[str, None]" = OrderedDict()
+        # The preloaded IDs are ordered most recent first
+        for trace_id in reversed(processed_trace_ids or []):
+            self.add_processed_trace_id(trace_id)
 
     def _create_consumer(self) -> Consumer:
         """Create a Kafka consumer with the appropriate configuration"""
@@ -50,11 +198,27 @@ class KafkaConsumer:
             "enable.auto.commit": False,
             "session.timeout.ms": 180000,  # 3 minutes
             "max.poll.interval.ms": 300000,  # 5 minutes
+            # Fetch larger chunks per broker round trip
+            "fetch.min.bytes": self.fetch_min_bytes,
+            "fetch.wait.max.ms": self.fetch_max_wait_ms,
+            "max.partition.fetch.bytes": self.max_partition_fetch_bytes,
+            # Prefetch into the local queue while batches are being handled
+            "queued.max.messages.kbytes": self.queued_max_messages_kbytes,
+            "queued.min.messages": self.queued_min_messages,
+            # Receive large compressed fetch responses without splitting them
+            "receive.message.max.bytes": self.receive_message_max_bytes,
+            "socket.receive.buffer.bytes": self.socket_receive_buffer_bytes,
+            # Report the result of asynchronous commits
+            "on_commit": self._on_commit,
         }
 
         if self.group_id:
             config["group.id"] = self.group_id
 
+        if self.compression_codec:
+            # Fails consumer creation if librdkafka was built without the codec
+            config["builtin.features"] = self.compression_codec
+
         if self.enable_auth:
             if not self.username or not self.password:
                 raise ValueError("Kafka authentication enabled but missing credentials")
@@ -83,10 +247,21 @@ class KafkaConsumer:
         )
 
         consumer = Consumer(config)
-        consumer.subscribe([self.topic])
+        consumer.subscribe([self.topic], on_revoke=self._on_revoke)
 
         return consumer
 
+    def _on_commit(self, err, partitions) -> None:
+        """Log failed offset commits"""
+        if err:
+            self.logger.error(f"Failed to commit offsets: {err}")
+
+    def _on_revoke(self, consumer, partitions) -> None:
+        """Commit everything handled so far before partitions are reassigned"""
+        self.logger.info("Partitions revoked", "partitions", partitions)
+        self._flush_all()
+        self._commit_completed(wait_for_all=True)
+
     def _reconnect(self) -> None:
         """Attempt to reconnect the consumer"""
         self.logger.info("Beginning reconnection process...")
@@ -100,12 +275,154 @@ class KafkaConsumer:
         self.logger.info("Successfully reconnected to Kafka with new consumer")
 
     def add_processed_trace_id(self, trace_id: str) -> None:
-        """Add a trace ID to the set of processed trace IDs"""
-        self.processed_trace_ids.add(trace_id)
+        """Add a trace ID to the processed trace IDs, evicting the least recent"""
+        with self.processed_trace_ids_lock:
+            processed_trace_ids = self.processed_trace_ids
+            size = len(processed_trace_ids)
+            processed_trace_ids[trace_id] = None
+            if len(processed_trace_ids) == size:
+                # Already known, only refresh its position
+                processed_trace_ids.move_to_end(trace_id)
+            elif size >= self.processed_trace_ids_size:
+                processed_trace_ids.popitem(last=False)
+
+    def _add_pending_offset(self, lane: _Lane, msg) -> None:
+        """Record a message offset to be committed with the current batch"""
+        if lane.batch_started_at is None:
+            lane.batch_started_at = time.monotonic()
+        lane.pending_offsets[(msg.topic(), msg.partition())] = msg.offset() + 1
+        lane.pending_messages += 1
+
+    def _batch_due(self, lane: _Lane) -> bool:
+        """Check whether the current batch of a lane should be flushed"""
+        if lane.batch_started_at is None:
+            return False
+        if len(lane.batch) >= self.batch_size:
+            return True
+        elapsed_ms = (time.monotonic() - lane.batch_started_at) * 1000
+        return elapsed_ms >= self.batch_timeout_ms
+
+    def _process_batch(self, batch: List[TraceProcessedMessage]) -> None:
+        """Pass a batch to the handler with retries, run on a worker thread"""
+        if not batch:
+            return
+
+        # Process batch with retries
+        process_error = None
+        for retry in range(self.max_retries + 1):
+            if retry > 0:
+                sleep_time = self.retry_backoff_ms / 1000.0
+                self.logger.info(
+                    f"Retrying batch processing in {sleep_time}s",
+                    "attempt",
+                    retry,
+                    "size",
+                    len(batch),
+                )
+                time.sleep(sleep_time)
+
+            try:
+                success = self.handler(batch)
+                if success:
+                    # Add to processed set
+                    for trace_msg in batch:
+                        self.add_processed_trace_id(trace_msg.traceId)
+                    process_error = None
+                    break
+                else:
+                    process_error = _HANDLER_RETURNED_FALSE
+            except Exception as e:
+                process_error = e
+                self.logger.error(
+                    f"Error processing batch: {str(e)}",
+                    e,
+                    "attempt",
+                    retry,
+                    "size",
+                    len(batch),
+                )
 
-    def is_trace_processed(self, trace_id: str) -> bool:
-        """Check if a trace ID has already been processed"""
-        return trace_id in self.processed_trace_ids
+        if process_error:
+            self.logger.error(
+                "Failed to process batch after max retries",
+                process_error,
+                "traceIds",
+                [trace_msg.traceId for trace_msg in batch],
+            )
+        else:
+            self.logger.info("Successfully processed batch", "size", len(batch))
+
+    def _flush_batch(self, lane: _Lane) -> None:
+        """Hand the pending batch of a lane to its worker"""
+        if not lane.pending_offsets:
+            return
+
+        # Bound the number of batches in flight so slow handlers
+        # apply backpressure instead of buffering without limit
+        if len(lane.in_flight) >= self.LANE_QUEUE_SIZE:
+            self._commit_completed(wait_for_lane=lane)
+
+        self.logger.info("Flushing batch", "size", len(lane.batch))
+        future = lane.executor.submit(self._process_batch, lane.batch)
+        lane.in_flight.append((future, lane.pending_offsets, lane.pending_messages))
+
+        lane.batch = []
+        lane.pending_offsets = {}
+        lane.pending_messages = 0
+        lane.batch_started_at = None
+
+    def _flush_all(self) -> None:
+        """Hand the pending batches of all lanes to their workers"""
+        for lane in self.lanes:
+            self._flush_batch(lane)
+
+    def _commit_completed(
+        self, wait_for_lane: Optional[_Lane] = None, wait_for_all: bool = False
+    ) -> None:
+        """
+        Commit the offsets of handled batches
+
+        A partition always maps to the same lane and a lane handles its
+        batches in the order they were submitted, so an offset is only
+        committed once every earlier batch of its partition has been handled.
+        Commits are asynchronous and coalesced, except when waiting for all
+        batches, which is done before the partitions change hands.
+        """
+        for lane in self.lanes:
+            in_flight = lane.in_flight
+            while in_flight:
+                future, batch_offsets, batch_messages = in_flight[0]
+                if not future.done():
+                    if not (wait_for_all or lane is wait_for_lane):
+                        break
+                    # Only wait for the oldest batch of the lane
+                    wait_for_lane = None
+                    future.result()
+                in_flight.popleft()
+                self.commit_offsets.update(batch_offsets)
+                self.commit_messages += batch_messages
+
+        if not self.commit_offsets:
+            return
+
+        now = time.monotonic()
+        if not wait_for_all and self.commit_messages < self.commit_every:
+            if (now - self.last_commit_at) * 1000 < self.commit_interval_ms:
+                return
+
+        # Commit the offsets, even if processing failed, to avoid getting stuck
+        offsets = [
+            TopicPartition(topic, partition, offset)
+            for (topic, partition), offset in self.commit_offsets.items()
+        ]
+        self.commit_offsets = {}
+        self.commit_messages = 0
+        self.last_commit_at = now
+        self.logger.debug("Committing offsets", "offsets", offsets)
+        try:
+            self.consumer.commit(offsets=offsets, asynchronous=not wait_for_all)
+        except KafkaException as e:
+            self.logger.error("Failed to commit offsets", e)
 
     def consume(self) -> None:
         """Consume messages from Kafka"""
@@ -123,191 +440,164 @@ class KafkaConsumer:
         max_reconnect_attempts = 15
         reconnect_backoff = 0.5  # seconds
 
-        self.running = True
-
-        while self.running:
-            try:
-                msg = self.consumer.poll(timeout=1.0)
-
-                if msg is None:
-                    continue
-
-                if msg.error():
-                    if msg.error().code() == KafkaError._PARTITION_EOF:
-                        # End of partition event
-                        self.logger.info(f"Reached end of partition {msg.partition()}")
-                        continue
-                    else:
-                        self.logger.error(f"Consumer error: {msg.error()}")
-
-                        # Attempt reconnect
-                        if reconnect_attempts < max_reconnect_attempts:
-                            reconnect_attempts += 1
-                            time.sleep(reconnect_backoff)
-                            reconnect_backoff *= 2
-                            if reconnect_backoff > 10:
-                                reconnect_backoff = 10
-
-                            self._reconnect()
-                        else:
-                            self.logger.error(
-                                "Maximum reconnect attempts reached, will retry in 30 seconds"
-                            )
-                            time.sleep(30)
-                            reconnect_attempts = 0
-                            reconnect_backoff = 0.5
-
-                        continue
+        # Bound once for the per-message loop below, the consumer itself is
+        # looked up on every poll as it is replaced on reconnect
+        logger = self.logger
+        add_pending_offset = self._add_pending_offset
+        lanes = self.lanes
+        lane_count = len(lanes)
+        decode = _DECODER.decode
+        processed_trace_ids = self.processed_trace_ids
+        batch_size = self.batch_size
+        stop_event = self.stop_event
 
-                # Reset reconnect attempts on successful message
-                reconnect_attempts = 0
-                reconnect_backoff = 0.5
+        self.stopped.clear()
 
-                # Process message
-                value = msg.value()
-                self.logger.info(
-                    "Received message",
-                    "topic",
-                    msg.topic(),
-                    "partition",
-                    msg.partition(),
-                    "offset",
-                    msg.offset(),
-                    "length",
-                    len(value) if value else 0,
+        while not stop_event.is_set():
+            try:
+                for lane in lanes:
+                    if self._batch_due(lane):
+                        self._flush_batch(lane)
+                self._commit_completed()
+
+                # Drain up to max_poll_records messages per call
+                msgs = self.consumer.consume(
+                    num_messages=self.max_poll_records, timeout=self.poll_timeout
                 )
 
-                if value:
-                    try:
-                        # Parse message
-                        message_dict = json.loads(value)
-
-                        # Parse ISO format dates
-                        self._parse_dates_in_dict(message_dict)
+                if self.tick_handler:
+                    self.tick_handler()
 
-                        # Create TraceProcessedMessage from dict
-                        trace_msg = TraceProcessedMessage(**message_dict)
+                # Checked once per poll, per message logs are skipped entirely
+                log_messages = logger.is_enabled_for(Logger.DEBUG)
 
-                        # Check if this trace has already been processed
-                        if self.is_trace_processed(trace_msg.traceId):
-                            self.logger.info(
-                                f"Trace {trace_msg.traceId} already processed, skipping"
-                            )
-                            # Still commit the message to avoid getting it again
-                            self.consumer.commit(message=msg, asynchronous=False)
+                for msg in msgs:
+                    if msg.error():
+                        if msg.error().code() == KafkaError._PARTITION_EOF:
+                            # End of partition event
+                            logger.info(f"Reached end of partition {msg.partition()}")
                             continue
-
-                        # Process message with retries
-                        process_error = None
-                        for retry in range(self.max_retries + 1):
-                            if retry > 0:
-                                sleep_time = self.retry_backoff_ms / 1000.0
-                                self.logger.info(
-                                    f"Retrying message processing in {sleep_time}s",
-                                    "attempt",
-                                    retry,
-                                    "traceId",
-                                    trace_msg.traceId,
-                                )
-                                time.sleep(sleep_time)
-
-                            try:
-                                success = self.handler(trace_msg)
-                                if success:
-                                    # Add to processed set
-                                    self.add_processed_trace_id(trace_msg.traceId)
-                                    process_error = None
+                        else:
+                            logger.error(f"Consumer error: {msg.error()}")
+
+                            # Hand off what we have before replacing the consumer
+                            self._flush_all()
+                            self._commit_completed(wait_for_all=True)
+
+                            # Attempt reconnect
+                            if reconnect_attempts < max_reconnect_attempts:
+                                reconnect_attempts += 1
+                                # Jitter spreads out reconnects of consumers
+                                # that lost the same broker at the same time
+                                if stop_event.wait(
+                                    min(
+                                        10, reconnect_backoff * random.uniform(1.0, 1.5)
+                                    )
+                                ):
                                     break
-                                else:
-                                    process_error = Exception("Handler returned False")
-                            except Exception as e:
-                                process_error = e
-                                self.logger.error(
-                                    f"Error processing message: {str(e)}",
-                                    e,
-                                    "attempt",
-                                    retry,
-                                    "traceId",
-                                    trace_msg.traceId,
+                                reconnect_backoff *= 2
+                                if reconnect_backoff > 10:
+                                    reconnect_backoff = 10
+
+                                self._reconnect()
+                            else:
+                                logger.error(
+                                    "Maximum reconnect attempts reached, will retry in 30 seconds"
                                 )
-
-                        # Commit the message
-                        self.logger.info("Committing message", "offset", msg.offset())
-                        self.consumer.commit(message=msg, asynchronous=False)
-
-                        if process_error:
-                            self.logger.error(
-                                "Failed to process message after max retries",
-                                process_error,
-                                "traceId",
-                                trace_msg.traceId,
-                            )
-                        else:
-                            self.logger.info(
-                                "Successfully processed message",
-                                "traceId",
-                                trace_msg.traceId,
-                            )
-                    except json.JSONDecodeError as e:
-                        self.logger.error("Error decoding message JSON", e)
-                        # Commit invalid message to avoid getting stuck
-                        self.consumer.commit(message=msg, asynchronous=False)
-                    except Exception as e:
-                        self.logger.error("Error processing message", e)
-                        # Commit the message even if processing failed
-                        self.consumer.commit(message=msg, asynchronous=False)
+                                stop_event.wait(30)
+                                reconnect_attempts = 0
+                                reconnect_backoff = 0.5
+
+                            # The remaining messages belong to the old consumer
+                            break
+
+                    # Reset reconnect attempts on the first successful message
+                    if reconnect_attempts:
+                        reconnect_attempts = 0
+                        reconnect_backoff = 0.5
+
+                    # Process message
+                    value = msg.value()
+                    if log_messages:
+                        logger.debug(
+                            "Received message",
+                            "topic",
+                            msg.topic(),
+                            "partition",
+                            msg.partition(),
+                            "offset",
+                            msg.offset(),
+                            "length",
+                            len(value) if value else 0,
+                        )
+
+                    # Every received message is committed with the batch it
+                    # arrived in, including ones that are skipped or invalid
+                    lane = lanes[msg.partition() % lane_count]
+                    add_pending_offset(lane, msg)
+
+                    if value:
+                        try:
+                            # Parse and validate the message, including its dates
+                            trace_msg = decode(value)
+
+                            # Check if this trace has already been processed
+                            if trace_msg.traceId in processed_trace_ids:
+                                if logger.is_enabled_for(Logger.INFO):
+                                    logger.info(
+                                        f"Trace {trace_msg.traceId} already processed, skipping"
+                                    )
+                                continue
+
+                            lane.batch.append(trace_msg)
+                            if len(lane.batch) >= batch_size:
+                                self._flush_batch(lane)
+                        except msgspec.DecodeError as e:
+                            logger.error("Error decoding message", e)
+                        except Exception as e:
+                            logger.error("Error processing message", e)
             except KafkaException as e:
-                self.logger.error("Kafka exception", e)
-                time.sleep(1)  # Avoid tight loop
+                logger.error("Kafka exception", e)
+                stop_event.wait(1)  # Avoid tight loop
+            except Exception as e:
+                logger.error("Unexpected exception", e)
+                stop_event.wait(1)  # Avoid tight loop
+
+        # Handle what is left, commit it and close the consumer on this thread
+        try:
+            self._flush_all()
+            self._commit_completed(wait_for_all=True)
+        except Exception as e:
+            self.logger.error("Failed to commit offsets on shutdown", e)
+        finally:
+            self._close_consumer()
+            self.stopped.set()
+
+    def _close_consumer(self) -> None:
+        """Close the underlying consumer if it is still open"""
+        if self.consumer:
+            consumer, self.consumer = self.consumer, None
+            try:
+                consumer.close()
             except Exception as e:
-                self.logger.error("Unexpected exception", e)
-                time.sleep(1)  # Avoid tight loop
+                self.logger.error("Failed to close Kafka consumer", e)
 
-    def _parse_dates_in_dict(self, data: Dict) -> None:
-        """
-        Recursively parse ISO format date strings to datetime objects in a dictionary
-        Modifies the dictionary in place
+    def close(self) -> None:
         """
-        if not isinstance(data, dict):
-            return
-
-        for key, value in data.items():
-            if isinstance(value, str) and self._looks_like_iso_date(value):
-                try:
-                    # Try to use dateutil parser which is more flexible with formats
-                    from dateutil import parser
-
-                    data[key] = parser.parse(value)
-                except (ImportError, Exception):
-                    # Fallback method if dateutil is not available
-                    try:
-                        # Handle Z or timezone info
-                        if value.endswith("Z"):
-                            value = value[:-1] + "+00:00"
-                        data[key] = datetime.fromisoformat(value)
-                    except ValueError:
-                        # If still failing, leave as string
-                        pass
-            elif isinstance(value, dict):
-                self._parse_dates_in_dict(value)
-            elif isinstance(value, list):
-                for item in value:
-                    if isinstance(item, dict):
-                        self._parse_dates_in_dict(item)
-
-    def _looks_like_iso_date(self, value: str) -> bool:
-        """Check if a string looks like an ISO format date"""
-        if not isinstance(value, str):
-            return False
-
-        # Simple heuristic: contains T and either Z or +/-
-        return ("T" in value) and (
-            value.endswith("Z") or "+" in value or "-" in value[10:]
-        )
+        Close the Kafka consumer
 
-    def close(self) -> None:
-        """Close the Kafka consumer"""
+        The consume loop stops within one poll, commits its final offsets
+        synchronously and closes the consumer itself.
+        """
         self.logger.info("Closing Kafka consumer")
-        self.running = False
-        if self.consumer:
-            self.consumer.close()
+        self.stop_event.set()
+        if not self.stopped.wait(timeout=30):
+            self.logger.error("Timed out waiting for the consume loop to stop")
+            # Drop queued batches so the worker threads do not block exit
+            for lane in self.lanes:
+                lane.executor.shutdown(wait=False, cancel_futures=True)
+            return
+        for lane in self.lanes:
+            lane.executor.shutdown(wait=True)
+        # Only still open if the consume loop never ran
+        self._close_consumer()
@@ -53,20 +53,32 @@ class Logger:
 
         return result
 
+    def is_enabled_for(self, level: int) -> bool:
+        """Check whether messages at the given level would be logged"""
+        return self.logger.isEnabledFor(level)
+
     def debug(self, msg: str, *keyvals: Any) -> None:
         """Log a debug message"""
+        if not self.logger.isEnabledFor(logging.DEBUG):
+            return
         self.logger.debug(f"{msg}{self._format_keyvals(keyvals)}")
 
     def info(self, msg: str, *keyvals: Any) -> None:
         """Log an info message"""
+        if not self.logger.isEnabledFor(logging.INFO):
+            return
         self.logger.info(f"{msg}{self._format_keyvals(keyvals)}")
 
     def warn(self, msg: str, *keyvals: Any) -> None:
         """Log a warning message"""
+        if not self.logger.isEnabledFor(logging.WARNING):
+            return
         self.logger.warning(f"{msg}{self._format_keyvals(keyvals)}")
 
     def error(self, msg: str, err: Exception = None, *keyvals: Any) -> None:
         """Log an error message"""
+        if not self.logger.isEnabledFor(logging.ERROR):
+            return
         err_msg = f" error={err}" if err else ""
         self.logger.error(f"{msg}{err_msg}{self._format_keyvals(keyvals)}")
 
@@ -77,6 +89,12 @@ class Logger:
         sys.exit(1)
 
 
+_loggers: Dict[str, Logger] = {}
+
+
 def get_logger(name: str = "trace-consumer") -> Logger:
-    """Get a logger instance"""
-    return Logger(name)
+    """Get the shared logger instance for a name"""
+    logger = _loggers.get(name)
+    if logger is None:
+        logger = _loggers.setdefault(name, Logger(name))
+    return logger